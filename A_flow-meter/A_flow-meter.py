@@ -1,8 +1,6 @@
-from itertools import product
-from logging import root
-from multiprocessing import parent_process
 import adsk.core, adsk.fusion, adsk.cam, traceback
-from math import radians, pi, cos, degrees
+from functools import lru_cache
+from math import radians, sin, degrees, pi
 
 # Global design parameters
 defaultHoles = 6            # number of screw holes
@@ -11,6 +9,8 @@ defaultLength = 100
 defaultTheta = radians(70) # [deg] angle between sensor-pipe and main-pipe
 defaultD = 40              # [cm] pipe/valve diameter
 
+HALF_PI = pi/2             # [rad] 90 deg
+
 # Global set of event _handlers to keep them referenced for the duration of the command
 _handlers = []
 
@@ -18,6 +18,19 @@ app = adsk.core.Application.get()
 if app:
     ui = app.userInterface
 
+# Shorthands for the API constructors used throughout the build
+_Point3D = adsk.core.Point3D.create
+_VI = adsk.core.ValueInput.createByReal
+_VIS = adsk.core.ValueInput.createByString
+
+# Value inputs that do not depend on the design parameters
+VI_1 = _VI(1)
+VI_2 = _VI(2)
+VI_360 = _VIS('360 deg')
+
+# Input entities of a circular pattern, refilled by FlowValve._pattern for every pattern
+_pattern_entities = adsk.core.ObjectCollection.create()
+
 new_comp = None
 
 def createNewComponent():
@@ -29,33 +42,46 @@ def createNewComponent():
     new_occ = all_occs.addNewComponent(adsk.core.Matrix3D.create())
     return new_occ.component
 
+@lru_cache(maxsize=32)
+def sharedValueInputs(*values):
+    """Returns one real value input per value. Cached, so rebuilding a flow valve with
+    the same dimensions (e.g. repeated previews) reuses the value inputs of the previous build."""
+    return tuple(_VI(value) for value in values)
+
 
 class FlowValveCommandExecuteHandler(adsk.core.CommandEventHandler):
     """Event handler that reacts to any changes the user makes to any of the command inputs."""
-    def __init__(self):
+    def __init__(self, flow_valve):
         super().__init__()
+        self._valve = flow_valve        # shared with the other handler of the same command
     def notify(self, args: adsk.core.CommandEventArgs):
         try:
             unitsMgr = app.activeProduct.unitsManager
             command: adsk.core.Command = args.firingEvent.sender
             inputs = command.commandInputs
 
-            flow_valve = FlowValve()
-            for input in inputs:
-                if input.id == 'theta':
-                    flow_valve.theta = unitsMgr.evaluateExpression(input.expression, "deg")
-                elif input.id == 'D':
-                    flow_valve.D = unitsMgr.evaluateExpression(input.expression, "cm")
-                elif input.id == 'L':
-                    flow_valve.L = unitsMgr.evaluateExpression(input.expression, "cm")
-                elif input.id == 'RH':
-                    flow_valve.RH = unitsMgr.evaluateExpression(input.expression, "cm")
-                elif input.id == 'H':
-                    flow_valve.H = unitsMgr.evaluateExpression(input.expression, "pcs")
-                elif input.id == 'P':
-                    input.formattedText = f'~ {round(flow_valve.P, 2)} cm'
-                elif input.id == 'WT':
-                    input.formattedText = f'~ {round(flow_valve.WT, 2)} cm'
+            theta = unitsMgr.evaluateExpression(inputs.itemById('theta').expression, "deg")
+            D = unitsMgr.evaluateExpression(inputs.itemById('D').expression, "cm")
+            L = unitsMgr.evaluateExpression(inputs.itemById('L').expression, "cm")
+            RH = unitsMgr.evaluateExpression(inputs.itemById('RH').expression, "cm")
+            H = unitsMgr.evaluateExpression(inputs.itemById('H').expression, "pcs")
+
+            # Read-only text boxes are computed directly from the inputs
+            sin_theta = sin(theta)
+            P_text = f'{round(D/sin_theta, 2)}' if sin_theta != 0 else '∞'
+            inputs.itemById('P').formattedText = f'~ {P_text} cm'
+            inputs.itemById('WT').formattedText = f'~ {round(D*0.1, 2)} cm'
+
+            # Parallel pipes (theta = 0) have no transducer distance, so there is nothing to build
+            if sin_theta == 0:
+                return
+
+            flow_valve = self._valve
+            flow_valve.theta = theta
+            flow_valve.D = D
+            flow_valve.L = L
+            flow_valve.RH = RH
+            flow_valve.H = H
             flow_valve.create_flow_valve()
             args.isValidResult = True
 
@@ -90,13 +116,16 @@ class FlowValveCommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
             # Get the command that was created.
             cmd = adsk.core.Command.cast(args.command)
 
+            # One flow valve is shared by the execute and preview handlers
+            flow_valve = FlowValve()
+
             # Connect to the command event handler.
-            onExecute = FlowValveCommandExecuteHandler()
+            onExecute = FlowValveCommandExecuteHandler(flow_valve)
             cmd.execute.add(onExecute)
             _handlers.append(onExecute) # keep the handler referenced beyond this function
 
             # Connect to the command event handler.
-            onExecutePreview = FlowValveCommandExecuteHandler()
+            onExecutePreview = FlowValveCommandExecuteHandler(flow_valve)
             cmd.executePreview.add(onExecutePreview)
             _handlers.append(onExecutePreview) # keep the handler referenced beyond this function
 
@@ -113,26 +142,26 @@ class FlowValveCommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
             #_imgInput.isFullWidth = True
 
             # Define the value inputs for the command
-            _initTheta = adsk.core.ValueInput.createByReal(defaultTheta)
+            _initTheta = _VI(defaultTheta)
             inputs.addValueInput('theta', 'Angle (θ)', 'deg', _initTheta)
 
-            _initD = adsk.core.ValueInput.createByReal(defaultD)
+            _initD = _VI(defaultD)
             inputs.addValueInput('D', 'Main Pipe Outer Diameter (D)', 'cm', _initD)
            
-            _initL = adsk.core.ValueInput.createByReal(defaultLength)
+            _initL = _VI(defaultLength)
             inputs.addValueInput('L', 'Length (L)', 'cm', _initL)
 
-            _initRH = adsk.core.ValueInput.createByReal(defaultRH)
+            _initRH = _VI(defaultRH)
             inputs.addValueInput('RH', 'Screw hole radius', 'cm', _initRH)
 
-            _initH = adsk.core.ValueInput.createByReal(defaultHoles)
+            _initH = _VI(defaultHoles)
             inputs.addValueInput('H', 'Number of screw holes', 'pcs', _initH)
 
            
             # Define a read-only textbox for the command
-            _initP = round(defaultD/cos(pi/2-defaultTheta), 2)
+            _initP = round(defaultD/sin(defaultTheta), 2)
             inputs.addTextBoxCommandInput('P', 'Transducer distance (P)', f'~ {_initP} cm', 1, True)
-            _initWT = round(defaultD/2-(defaultD/2-defaultD/10))
+            _initWT = round(defaultD*0.1)
             inputs.addTextBoxCommandInput('WT', 'Wall thickness (WT)', f'~ {_initWT} cm', 1, True)
         except:
             if ui:
@@ -147,10 +176,10 @@ class FlowValve():
         self._theta = defaultTheta           # angle between sensor-pipe and main-pipe
         self._D = defaultD                   # main pipe diameter
         self._L = defaultLength
-        self._WT = self.calculate_WT()       # wall thickness of main pipe
         self._d = 15                         # sensor pipe diameter
-        # self._P = defaultP                 # distance between transducers
-        self._P = self.calculate_P()         # distance between transducers
+        self._planes = {}                    # offset planes of the current build, see _offset_plane
+        self._P = None                       # distance between transducers, computed on demand
+        self._P_dirty = True                 # set whenever theta or D changes
 
     # Properties
     @property
@@ -179,7 +208,7 @@ class FlowValve():
     def theta(self, value: float):
         """Angle between sensor-pipe and main-pipe."""
         self._theta = value
-        self.calculate_P()
+        self._P_dirty = True
     @property
     def D(self) -> float:
         """Main-pipe diameter."""
@@ -188,35 +217,122 @@ class FlowValve():
     def D(self, value: float):
         """Main-pipe diameter."""
         self._D = value
-        self.calculate_P()
+        self._P_dirty = True
     @property
     def P(self) -> float:
         """Distance between transducers."""
+        if self._P_dirty:
+            self._P = self.calculate_P()
+            self._P_dirty = False
         return self._P
 
     @property
     def WT(self) -> float:
         """Wall thickness of main-pipe"""
-        return self._WT
+        return self.calculate_WT()
 
     # Methods
     def calculate_P(self):
-        self._P = self._D/cos(pi/2-self._theta)
-        return self._P
+        sin_theta = sin(self._theta)
+        return self._D/sin_theta if sin_theta != 0 else float('inf')
 
     def calculate_WT(self):
-        self._WT = self._D/2-(self.D/2-self.D/10)
-        return self._WT
+        return self._D*0.1
+
+    def _offset_plane(self, comp, planarEntity, offset, base):
+        """Returns a construction plane offset from the planar entity by the offset value input.
+        Planes are memoized per build by base, a name the caller gives the planar entity,
+        so equal offsets from the same base share one plane."""
+        key = (base, round(offset.realValue, 6))
+        if key not in self._planes:
+            const_offsetPlane_input = comp.constructionPlanes.createInput()
+            const_offsetPlane_input.setByOffset(planarEntity=planarEntity, offset=offset)
+            self._planes[key] = comp.constructionPlanes.add(const_offsetPlane_input)
+        return self._planes[key]
+
+    def _build_spool(self, comp, plane, radius_outer, radius_inner, flange, flange_symmetric,
+                     hole_center, hole_radius, hole_depth, hole_symmetric, axis, quantity, center):
+        """Creates a spool piece on the plane: a flange ring with a circular pattern of screw holes.
+        The rings are centered on center, given in sketch space.
+        Returns the flange extrude feature and the circular pattern feature."""
+        ef = comp.features.extrudeFeatures
+        #Sketch
+        sketch_spool = comp.sketches.add(plane)
+        circles_spool = sketch_spool.sketchCurves.sketchCircles
+        circle_spool_o = circles_spool.addByCenterRadius(centerPoint=center, radius=radius_outer)                                #item(0)
+        circle_spool_i = circles_spool.addByCenterRadius(centerPoint=circle_spool_o.centerSketchPoint, radius=radius_inner)      #item(1)
+        #Extrude
+        spool_profile = sketch_spool.profiles.item(0)
+        ext_spool_input = ef.createInput(profile=spool_profile, operation=adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
+        ext_spool_input.setDistanceExtent(isSymmetric=flange_symmetric, distance=flange)
+        spool = ef.add(ext_spool_input)
+        #Sketch
+        parent_sketch = circles_spool.addByCenterRadius(centerPoint=hole_center, radius=hole_radius)   #item(2)
+        #Extrude Cut
+        spool_profile = sketch_spool.profiles.item(2)
+        ext_spool_hole = ef.createInput(profile=spool_profile, operation=adsk.fusion.FeatureOperations.CutFeatureOperation)
+        ext_spool_hole.setDistanceExtent(isSymmetric=hole_symmetric, distance=hole_depth)
+        circle_cut = ef.add(ext_spool_hole)
+        #Circular Pattern
+        CircularPattern = self._pattern(comp, circle_cut, axis, quantity)
+        return spool, CircularPattern
+
+    def _pattern(self, comp, feature, axis, quantity):
+        """Creates a circular pattern of the feature around the axis"""
+        CircularPatterns = comp.features.circularPatternFeatures
+        _pattern_entities.clear()
+        _pattern_entities.add(feature)
+        CircularPatternInput = CircularPatterns.createInput(_pattern_entities, axis)
+        CircularPatternInput.quantity = quantity
+        CircularPatternInput.totalAngle = VI_360
+        CircularPatternInput.isSymmetric = False
+        return CircularPatterns.add(CircularPatternInput)
 
     def create_flow_valve(self):
         """Creates and builds the flow valve based on specified property values"""
+        # Bind the design parameters and the derived dimensions once
+        D = self.D
+        d = self._d
+        P = self.P
+        L = self.L
+        H = self.H
+        RH = self.RH
+        theta = self.theta
+        d2 = d*0.5                  # sensor pipe outer radius
+        P2 = P*0.5                  # half distance between transducers
+        d_outer = d - d*0.1         # sensor pipe spool piece outer radius
+        d_inner = d2 - d*0.1        # sensor pipe inner radius, also the ball radius
+        cut_r = d2 - d*0.25         # radius of the bore through the ball
+        D_inner = D*0.5 - D*0.1     # main pipe inner radius
+        half_ext = P2 + 70          # half length of the sensor pipe
+        d_cut = 0.2*d               # depth of the sensor pipe spool holes
+        D_cut = 0.2*D               # depth/thickness of the main pipe spool pieces
+        # Value inputs shared by several features
+        vi_half_ext, vi_d_cut, vi_D_cut, vi_half_L, vi_H, vi_ball = sharedValueInputs(
+            half_ext, d_cut, D_cut, L/2,
+            H,                      # screw holes per spool piece
+            P2+87)                  # offset of the ball and pipe box planes
+        # Points shared by several sketches. Point3D is mutable, so they are created per build
+        # and must not be modified by the sketches that use them
+        origin = _Point3D(0, 0, 0)                  # center of the sketches centered on their plane
+        hole_center_sp = _Point3D(0, d-5, 0)        # screw hole of the sensor pipe spool pieces
+        hole_center_mp = _Point3D(0, D-D/5, 0)      # screw hole of the main pipe spool pieces
+
+        # Remember where this build starts in the timeline (parametric designs only),
+        # so the new component and all its features end up in one group
+        design = adsk.fusion.Design.cast(app.activeProduct)
+        timeline = design.timeline if design.designType == adsk.fusion.DesignTypes.ParametricDesignType else None
+        timeline_start = timeline.markerPosition if timeline else None
 
         new_comp = createNewComponent()
         if new_comp is None:
             ui.messageBox('New component failed to create', 'New Component Failed')
             return
+        self._planes = {}
+        ef = new_comp.features.extrudeFeatures
+        rf = new_comp.features.revolveFeatures
 
-        new_comp.name = f'Flow-valve (D{self.D}cm θ{degrees(self.theta)}deg)'
+        new_comp.name = f'Flow-valve (D{D}cm θ{degrees(theta)}deg)'
         # Defining a global center point
         center_global = new_comp.originConstructionPoint.geometry
        
@@ -225,107 +341,49 @@ class FlowValve():
         """This part creates the sensor pipe for the flow meter. It is created on an angled plane."""
         "Construction Plane"
         const_plane_sp_input = new_comp.constructionPlanes.createInput()
-        const_plane_sp_input.setByAngle(linearEntity=new_comp.xConstructionAxis, angle=adsk.core.ValueInput.createByReal(self.theta), planarEntity=new_comp.xYConstructionPlane)
+        const_plane_sp_input.setByAngle(linearEntity=new_comp.xConstructionAxis, angle=_VI(theta), planarEntity=new_comp.xYConstructionPlane)
         const_plane_sp = new_comp.constructionPlanes.add(const_plane_sp_input)
         "Sketch"
         sketch_sp = new_comp.sketches.add(const_plane_sp)
         center_sp = sketch_sp.modelToSketchSpace(center_global)
         circles_sp = sketch_sp.sketchCurves.sketchCircles
-        circle_sp_o = circles_sp.addByCenterRadius(centerPoint=center_sp, radius=self._d/2)
-        circle_sp_i = circles_sp.addByCenterRadius(centerPoint=circle_sp_o.centerSketchPoint, radius=self._d/2-self._d/10)
+        circle_sp_o = circles_sp.addByCenterRadius(centerPoint=center_sp, radius=d2)
+        circle_sp_i = circles_sp.addByCenterRadius(centerPoint=circle_sp_o.centerSketchPoint, radius=d_inner)
         "Extrude"
-        pipe_sp_profile = sketch_sp.profiles.item(0)  # get the pipe profile (profile between inner and outer circle)
-        ext_pipe_sp_input = new_comp.features.extrudeFeatures.createInput(profile=pipe_sp_profile, operation=adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-        ext_pipe_sp_input.setDistanceExtent(isSymmetric=True, distance=adsk.core.ValueInput.createByReal(self.P/2+70))
-        bodyOne = new_comp.features.extrudeFeatures.add(ext_pipe_sp_input)
+        profs_sp = sketch_sp.profiles
+        pipe_sp_profile = profs_sp.item(0)  # get the pipe profile (profile between inner and outer circle)
+        ext_pipe_sp_input = ef.createInput(profile=pipe_sp_profile, operation=adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
+        ext_pipe_sp_input.setDistanceExtent(isSymmetric=True, distance=vi_half_ext)
+        bodyOne = ef.add(ext_pipe_sp_input)
 
         # SENSOR PIPE SPOOL PIECE ------------------------------------------------------------------
         """This part creates the spool pieces of the sensor pipe. It is extended as 
         new bodies at the ends of the pipe."""
         #Body
         body = bodyOne.bodies.item(0)
-        circularFace = None
-        for face in body.faces:
-            geom = face.geometry
-            if geom.surfaceType == adsk.core.SurfaceTypes.CylinderSurfaceType:
-                circularFace = face
-                break
-        "Top spool piece"
-        #onstruction Axis
+        faces = body.faces
+        cylinder = adsk.core.SurfaceTypes.CylinderSurfaceType
+        circularFace = next((faces.item(i) for i in range(faces.count) if faces.item(i).geometry.surfaceType == cylinder), None)
+        #Construction Axis (shared by all spool pieces on the sensor pipe)
         const_axis_sp_input = new_comp.constructionAxes.createInput()
         const_axis_sp_input.setByCircularFace(circularFace)
         const_axis_sp = new_comp.constructionAxes.add(const_axis_sp_input)
+        "Top spool piece"
         #Construction Offset Plane
-        const_offsetPlane_input = new_comp.constructionPlanes.createInput()
-        const_offsetPlane_input.setByOffset(planarEntity=pipe_sp_profile, offset=adsk.core.ValueInput.createByReal(self.P/2+70))
-        const_offsetPlane = new_comp.constructionPlanes.add(const_offsetPlane_input)
-        #Centerpoint
-        center_sp = adsk.core.Point3D.create(0, 0, 0)
-        #Sketch
-        sketch_SP = new_comp.sketches.add(const_offsetPlane)
-        circle_SP = sketch_SP.sketchCurves.sketchCircles
-        circle_SP_o = circle_SP.addByCenterRadius(centerPoint=center_sp, radius=self._d-self._d/10)
-        circle_SP_i = circle_SP.addByCenterRadius(centerPoint=center_sp, radius=self._d/2-self._d/10)
-        #Extrude
-        pipe_SP_profile = sketch_SP.profiles.item(0)
-        ext_pipe_SP_input = new_comp.features.extrudeFeatures.createInput(profile=pipe_SP_profile, operation=adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-        ext_pipe_SP_input.setDistanceExtent(isSymmetric=True, distance=adsk.core.ValueInput.createByReal(1))
-        bodyTwo = new_comp.features.extrudeFeatures.add(ext_pipe_SP_input)
-        #Sketch
-        parent_sketch = sketch_SP.sketchCurves.sketchCircles.addByCenterRadius(centerPoint=adsk.core.Point3D.create(0,self._d-5,0), radius=2)                  #item(2)
-        #Extrude Cut
-        spool_profile = sketch_SP.profiles.item(2)
-        ext_spool_hole = new_comp.features.extrudeFeatures.createInput(profile=spool_profile, operation=adsk.fusion.FeatureOperations.CutFeatureOperation)
-        ext_spool_hole.setDistanceExtent(isSymmetric=True, distance=adsk.core.ValueInput.createByReal(0.2*self._d))
-        circle_cut = new_comp.features.extrudeFeatures.add(ext_spool_hole)
-        #Circular pattern
-        CircularPatterns = new_comp.features.circularPatternFeatures
-        inputEntitiesCollection = adsk.core.ObjectCollection.create()
-        inputEntitiesCollection.add(circle_cut)
-        inputAxis = const_axis_sp
-        CircularPatternInput = CircularPatterns.createInput(inputEntitiesCollection, inputAxis)
-        CircularPatternInput.quantity = adsk.core.ValueInput.createByReal(self.H)
-        CircularPatternInput.totalAngle = adsk.core.ValueInput.createByString('360 deg')
-        CircularPatternInput.isSymmetric = False
-        CircularPattern = CircularPatterns.add(CircularPatternInput)
+        const_offsetPlane = self._offset_plane(new_comp, pipe_sp_profile, vi_half_ext, 'sp')
+        #Spool piece
+        self._build_spool(new_comp, const_offsetPlane, radius_outer=d_outer, radius_inner=d_inner,
+                          flange=VI_1, flange_symmetric=True,
+                          hole_center=hole_center_sp, hole_radius=2, hole_depth=vi_d_cut, hole_symmetric=True,
+                          axis=const_axis_sp, quantity=vi_H, center=origin)
         "Bottom spool piece"
-        #Construction axis
-        const_axis_sp_input = new_comp.constructionAxes.createInput()
-        const_axis_sp_input.setByCircularFace(circularFace)
-        const_axis_sp = new_comp.constructionAxes.add(const_axis_sp_input)
         #Cosntruction Offset Plane
-        const_offsetPlane_input = new_comp.constructionPlanes.createInput()
-        const_offsetPlane_input.setByOffset(planarEntity=pipe_sp_profile, offset=adsk.core.ValueInput.createByReal(-self.P/2-70))
-        const_offsetPlane = new_comp.constructionPlanes.add(const_offsetPlane_input)
-        #Center Point
-        center_sp = adsk.core.Point3D.create(0, 0, 0)
-        #Sketch
-        sketch_SP = new_comp.sketches.add(const_offsetPlane)
-        circle_SP = sketch_SP.sketchCurves.sketchCircles
-        circle_SP_o = circle_SP.addByCenterRadius(centerPoint=center_sp, radius=self._d-self._d/10)
-        circle_SP_i = circle_SP.addByCenterRadius(centerPoint=center_sp, radius=self._d/2-self._d/10)
-        #Extrude
-        pipe_SP_profile = sketch_SP.profiles.item(0)
-        ext_pipe_SP_input = new_comp.features.extrudeFeatures.createInput(profile=pipe_SP_profile, operation=adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-        ext_pipe_SP_input.setDistanceExtent(isSymmetric=True, distance=adsk.core.ValueInput.createByReal(1))
-        bodyTwo = new_comp.features.extrudeFeatures.add(ext_pipe_SP_input)
-        #Sketch
-        parent_sketch = sketch_SP.sketchCurves.sketchCircles.addByCenterRadius(centerPoint=adsk.core.Point3D.create(0,self._d-5,0), radius=2)                 
-        #Extrude Cut
-        spool_profile = sketch_SP.profiles.item(2)
-        ext_spool_hole = new_comp.features.extrudeFeatures.createInput(profile=spool_profile, operation=adsk.fusion.FeatureOperations.CutFeatureOperation)
-        ext_spool_hole.setDistanceExtent(isSymmetric=True, distance=adsk.core.ValueInput.createByReal(0.2*self._d))
-        circle_cut = new_comp.features.extrudeFeatures.add(ext_spool_hole)
-        #Circular Pattern
-        CircularPatterns = new_comp.features.circularPatternFeatures
-        inputEntitiesCollection = adsk.core.ObjectCollection.create()
-        inputEntitiesCollection.add(circle_cut)
-        inputAxis = const_axis_sp
-        CircularPatternInput = CircularPatterns.createInput(inputEntitiesCollection, inputAxis)
-        CircularPatternInput.quantity = adsk.core.ValueInput.createByReal(self.H)
-        CircularPatternInput.totalAngle = adsk.core.ValueInput.createByString('360 deg')
-        CircularPatternInput.isSymmetric = False
-        CircularPattern = CircularPatterns.add(CircularPatternInput)
+        const_offsetPlane = self._offset_plane(new_comp, pipe_sp_profile, _VI(-half_ext), 'sp')
+        #Spool piece
+        self._build_spool(new_comp, const_offsetPlane, radius_outer=d_outer, radius_inner=d_inner,
+                          flange=VI_1, flange_symmetric=True,
+                          hole_center=hole_center_sp, hole_radius=2, hole_depth=vi_d_cut, hole_symmetric=True,
+                          axis=const_axis_sp, quantity=vi_H, center=origin)
         
         # MAIN PIPE --------------------------------------------------------------------
         """This part creates the main pipe of the flow meter which is on the xy plane."""
@@ -333,352 +391,174 @@ class FlowValve():
         sketch_mp = new_comp.sketches.add(new_comp.xYConstructionPlane)
         center_mp = sketch_mp.modelToSketchSpace(center_global)
         circles_mp = sketch_mp.sketchCurves.sketchCircles
-        circle_mp_o = circles_mp.addByCenterRadius(centerPoint=center_mp, radius=self.D/2)
-        circle_mp_i = circles_mp.addByCenterRadius(centerPoint=circle_mp_o.centerSketchPoint, radius=self.D/2-self.D/10)
+        circle_mp_o = circles_mp.addByCenterRadius(centerPoint=center_mp, radius=D/2)
+        circle_mp_i = circles_mp.addByCenterRadius(centerPoint=circle_mp_o.centerSketchPoint, radius=D_inner)
         #Extrude
         profiles_mp = adsk.core.ObjectCollection.create()
-        [profiles_mp.add(profile) for profile in sketch_mp.profiles]
-        ext_pipe_mp_cut_input = new_comp.features.extrudeFeatures.createInput(profile=profiles_mp, operation=adsk.fusion.FeatureOperations.CutFeatureOperation)
-        ext_pipe_mp_cut_input.setDistanceExtent(isSymmetric=True, distance=adsk.core.ValueInput.createByReal(self.L/2))
-        new_comp.features.extrudeFeatures.add(ext_pipe_mp_cut_input)
+        for profile in sketch_mp.profiles:
+            profiles_mp.add(profile)
+        ext_pipe_mp_cut_input = ef.createInput(profile=profiles_mp, operation=adsk.fusion.FeatureOperations.CutFeatureOperation)
+        ext_pipe_mp_cut_input.setDistanceExtent(isSymmetric=True, distance=vi_half_L)
+        ef.add(ext_pipe_mp_cut_input)
         #Join (main pipe and sensor pipe)
         pipe_mp_profile = sketch_mp.profiles.item(0)  # get the pipe profile (profile between inner and outer circle)
-        ext_pipe_mp_join_input = new_comp.features.extrudeFeatures.createInput(profile=pipe_mp_profile, operation=adsk.fusion.FeatureOperations.JoinFeatureOperation)
-        ext_pipe_mp_join_input.setDistanceExtent(isSymmetric=True, distance=adsk.core.ValueInput.createByReal(self.L/2))
-        new_comp.features.extrudeFeatures.add(ext_pipe_mp_join_input)
+        ext_pipe_mp_join_input = ef.createInput(profile=pipe_mp_profile, operation=adsk.fusion.FeatureOperations.JoinFeatureOperation)
+        ext_pipe_mp_join_input.setDistanceExtent(isSymmetric=True, distance=vi_half_L)
+        ef.add(ext_pipe_mp_join_input)
         #Extrude Cut
-        pipe_sp_profile_i = sketch_sp.profiles.item(1)  # get the center profile (profile by inner circle)
-        ext_pipe_sp_i_input = new_comp.features.extrudeFeatures.createInput(profile=pipe_sp_profile_i, operation=adsk.fusion.FeatureOperations.CutFeatureOperation)
-        ext_pipe_sp_i_input.setDistanceExtent(isSymmetric=True, distance=adsk.core.ValueInput.createByReal(self.P/2 + 70*3))
-        new_comp.features.extrudeFeatures.add(ext_pipe_sp_i_input)
+        pipe_sp_profile_i = profs_sp.item(1)  # get the center profile (profile by inner circle)
+        ext_pipe_sp_i_input = ef.createInput(profile=pipe_sp_profile_i, operation=adsk.fusion.FeatureOperations.CutFeatureOperation)
+        ext_pipe_sp_i_input.setDistanceExtent(isSymmetric=True, distance=_VI(P2 + 70*3))
+        ef.add(ext_pipe_sp_i_input)
+        #Construction Offset Planes at both ends of the main pipe
+        plane_right = self._offset_plane(new_comp, new_comp.xYConstructionPlane, vi_half_L, 'xy')
+        plane_left = self._offset_plane(new_comp, new_comp.xYConstructionPlane, _VI(-L/2), 'xy')
         "Spool piece right"
-        #Construction Offset Plane
-        const_offsetPlane_input = new_comp.constructionPlanes.createInput()
-        const_offsetPlane_input.setByOffset(planarEntity=new_comp.xYConstructionPlane, offset=adsk.core.ValueInput.createByReal(self.L/2))
-        const_offsetPlane = new_comp.constructionPlanes.add(const_offsetPlane_input)
-        #Sketch
-        sketch_spool = new_comp.sketches.add(const_offsetPlane)
-        center_spool = sketch_spool.modelToSketchSpace(adsk.core.Point3D.create(0,0,self.L/2))
-        circle_spool = sketch_spool.sketchCurves.sketchCircles
-        circle_spool_o = circle_spool.addByCenterRadius(centerPoint=center_spool, radius=self.D)                                                                    #item(0)
-        circle_spool_i = circle_spool.addByCenterRadius(centerPoint=circle_spool_o.centerSketchPoint, radius=self.D/2-self.D/10)                                    #item(1)
-        #Extrude
-        spool_profile = sketch_spool.profiles.item(0)
-        ext_spool_input = new_comp.features.extrudeFeatures.createInput(profile=spool_profile, operation=adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-        ext_spool_input.setDistanceExtent(isSymmetric=False, distance=adsk.core.ValueInput.createByReal(0.2*self.D))
-        new_comp.features.extrudeFeatures.add(ext_spool_input)
-        #Sketch
-        parent_sketch = sketch_spool.sketchCurves.sketchCircles.addByCenterRadius(centerPoint=adsk.core.Point3D.create(0,self.D-self.D/5,0), radius=self.RH)                  #item(2)
-        #Extrude Cut
-        spool_profile = sketch_spool.profiles.item(2)
-        ext_spool_hole = new_comp.features.extrudeFeatures.createInput(profile=spool_profile, operation=adsk.fusion.FeatureOperations.CutFeatureOperation)
-        ext_spool_hole.setDistanceExtent(isSymmetric=True, distance=adsk.core.ValueInput.createByReal(0.2*self.D))
-        circle_cut = new_comp.features.extrudeFeatures.add(ext_spool_hole)
-        app = adsk.core.Application.get()
-        ui = app.userInterface
-        design = app.activeProduct
-        #Circular Pattern
-        CircularPatterns = new_comp.features.circularPatternFeatures
-        inputEntitiesCollection = adsk.core.ObjectCollection.create()
-        inputEntitiesCollection.add(circle_cut)    
-        inputAxis = new_comp.zConstructionAxis
-        CircularPatternInput = CircularPatterns.createInput(inputEntitiesCollection, inputAxis)
-        CircularPatternInput.quantity = adsk.core.ValueInput.createByReal(self.H)
-        CircularPatternInput.totalAngle = adsk.core.ValueInput.createByString('360 deg')
-        CircularPatternInput.isSymmetric = False
-        CircularPattern = CircularPatterns.add(CircularPatternInput)
+        #Spool piece
+        self._build_spool(new_comp, plane_right, radius_outer=D, radius_inner=D_inner,
+                          flange=vi_D_cut, flange_symmetric=False,
+                          hole_center=hole_center_mp, hole_radius=RH, hole_depth=vi_D_cut, hole_symmetric=True,
+                          axis=new_comp.zConstructionAxis, quantity=vi_H, center=origin)
         "Spool piece left"
-        #Construction offset Plane
-        const_offsetPlane_input = new_comp.constructionPlanes.createInput()
-        const_offsetPlane_input.setByOffset(planarEntity=new_comp.xYConstructionPlane, offset=adsk.core.ValueInput.createByReal(self.L/2))
-        const_offsetPlane = new_comp.constructionPlanes.add(const_offsetPlane_input)
-        #Sketch
-        sketch_spool = new_comp.sketches.add(const_offsetPlane)
-        center_spool = sketch_spool.modelToSketchSpace(adsk.core.Point3D.create(0,0,-self.L/2))
-        circle_spool = sketch_spool.sketchCurves.sketchCircles
-        circle_spool_o = circle_spool.addByCenterRadius(centerPoint=center_spool, radius=self.D)                                                                    #item(0)
-        circle_spool_i = circle_spool.addByCenterRadius(centerPoint=circle_spool_o.centerSketchPoint, radius=self.D/2-self.D/10)                                    #item(1)  
-        #Extrude
-        spool_profile = sketch_spool.profiles.item(0)
-        ext_spool_input = new_comp.features.extrudeFeatures.createInput(profile=spool_profile, operation=adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-        ext_spool_input.setDistanceExtent(isSymmetric=False, distance=adsk.core.ValueInput.createByReal(-0.2*self.D))
-        new_comp.features.extrudeFeatures.add(ext_spool_input)
-        #Sketch
-        parent_sketch_2 = sketch_spool.sketchCurves.sketchCircles.addByCenterRadius(centerPoint=adsk.core.Point3D.create(0,self.D-self.D/5,-self.L), radius=self.RH)                  #item(2)
-        #Extrude Cut
-        spool_profile = sketch_spool.profiles.item(2)
-        ext_spool_hole = new_comp.features.extrudeFeatures.createInput(profile=spool_profile, operation=adsk.fusion.FeatureOperations.CutFeatureOperation)
-        ext_spool_hole.setDistanceExtent(isSymmetric=True, distance=adsk.core.ValueInput.createByReal(0.2*self.D))
-        circle_cut = new_comp.features.extrudeFeatures.add(ext_spool_hole)
-        app = adsk.core.Application.get()
-        ui = app.userInterface
-        design = app.activeProduct
-        #Circular Pattern
-        CircularPatterns = new_comp.features.circularPatternFeatures
-        inputEntitiesCollection = adsk.core.ObjectCollection.create()
-        inputEntitiesCollection.add(circle_cut)
-        inputAxis = new_comp.zConstructionAxis
-        CircularPatternInput = CircularPatterns.createInput(inputEntitiesCollection, inputAxis)
-        CircularPatternInput.quantity = adsk.core.ValueInput.createByReal(self.H)
-        CircularPatternInput.totalAngle = adsk.core.ValueInput.createByString('360 deg')
-        CircularPatternInput.isSymmetric = False
-        CircularPattern = CircularPatterns.add(CircularPatternInput)
+        #Spool piece
+        self._build_spool(new_comp, plane_left, radius_outer=D, radius_inner=D_inner,
+                          flange=_VI(-D_cut), flange_symmetric=False,
+                          hole_center=hole_center_mp, hole_radius=RH, hole_depth=vi_D_cut, hole_symmetric=True,
+                          axis=new_comp.zConstructionAxis, quantity=vi_H, center=origin)
 
         # BALL VALVE ------------------------------------------------------------------------------------------
         """This part creates a simple constructed ball valve. It consists of five parts: 
         Bottom and Top spool piece, pipe, ball and handle."""
         "Bottom spool piece"
         #Construction Offset Plane
-        const_offsetPlane_input = new_comp.constructionPlanes.createInput()
-        const_offsetPlane_input.setByOffset(planarEntity=pipe_sp_profile, offset=adsk.core.ValueInput.createByReal(self.P/2+71))
-        const_offsetPlane = new_comp.constructionPlanes.add(const_offsetPlane_input)
-        center_sp = adsk.core.Point3D.create(0, 0, 0)
-        #Sketch
-        sketch_SP = new_comp.sketches.add(const_offsetPlane)
-        circle_SP = sketch_SP.sketchCurves.sketchCircles
-        circle_SP_o = circle_SP.addByCenterRadius(centerPoint=center_sp, radius=self._d-self._d/10)
-        circle_SP_i = circle_SP.addByCenterRadius(centerPoint=center_sp, radius=self._d/2-self._d/10)
-        #Extrude
-        pipe_SP_profile = sketch_SP.profiles.item(0)
-        ext_pipe_SP_input = new_comp.features.extrudeFeatures.createInput(profile=pipe_SP_profile, operation=adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-        ext_pipe_SP_input.setDistanceExtent(isSymmetric=False, distance=adsk.core.ValueInput.createByReal(2))                                                                             #Endret til 'False' og '2'
-        bodyTwo = new_comp.features.extrudeFeatures.add(ext_pipe_SP_input)
-        #Sketch
-        parent_sketch = sketch_SP.sketchCurves.sketchCircles.addByCenterRadius(centerPoint=adsk.core.Point3D.create(0,self._d-5,0), radius=2)                  #item(2)
-        #Extrude Cut
-        spool_profile = sketch_SP.profiles.item(2)
-        ext_spool_hole = new_comp.features.extrudeFeatures.createInput(profile=spool_profile, operation=adsk.fusion.FeatureOperations.CutFeatureOperation)
-        ext_spool_hole.setDistanceExtent(isSymmetric=False, distance=adsk.core.ValueInput.createByReal(0.2*self._d))                                                                      #Endret til 'False'
-        circle_cut = new_comp.features.extrudeFeatures.add(ext_spool_hole)
-        #Circular Pattern
-        CircularPatterns = new_comp.features.circularPatternFeatures
-        inputEntitiesCollection = adsk.core.ObjectCollection.create()
-        inputEntitiesCollection.add(circle_cut)
-        inputAxis = const_axis_sp
-        CircularPatternInput = CircularPatterns.createInput(inputEntitiesCollection, inputAxis)
-        CircularPatternInput.quantity = adsk.core.ValueInput.createByReal(self.H)
-        CircularPatternInput.totalAngle = adsk.core.ValueInput.createByString('360 deg')
-        CircularPatternInput.isSymmetric = False
-        CircularPattern = CircularPatterns.add(CircularPatternInput)
+        const_offsetPlane = self._offset_plane(new_comp, pipe_sp_profile, _VI(P2+71), 'sp')
+        #Spool piece
+        self._build_spool(new_comp, const_offsetPlane, radius_outer=d_outer, radius_inner=d_inner,
+                          flange=VI_2, flange_symmetric=False,                                       #Endret til 'False' og '2'
+                          hole_center=hole_center_sp, hole_radius=2, hole_depth=vi_d_cut, hole_symmetric=False,   #Endret til 'False'
+                          axis=const_axis_sp, quantity=vi_H, center=origin)
         "Pipe"
         #Construction Offset Plane
-        const_offsetPlane_input = new_comp.constructionPlanes.createInput()
-        const_offsetPlane_input.setByOffset(planarEntity=pipe_sp_profile, offset=adsk.core.ValueInput.createByReal(self.P/2+72))
-        const_offsetPlane = new_comp.constructionPlanes.add(const_offsetPlane_input)
-        #Center Point
-        center_sp = adsk.core.Point3D.create(0, 0, 0)
+        const_offsetPlane = self._offset_plane(new_comp, pipe_sp_profile, _VI(P2+72), 'sp')
         #Sketch
-        sketch_SP = new_comp.sketches.add(const_offsetPlane)
-        circle_SP = sketch_SP.sketchCurves.sketchCircles
-        circle_SP_o = circle_SP.addByCenterRadius(centerPoint=center_sp, radius=self._d/2)
-        circle_SP_i = circle_SP.addByCenterRadius(centerPoint=center_sp, radius=self._d/2-self._d/10)
+        sketch_bvPipe = new_comp.sketches.add(const_offsetPlane)
+        circles_bvPipe = sketch_bvPipe.sketchCurves.sketchCircles
+        circle_bvPipe_o = circles_bvPipe.addByCenterRadius(centerPoint=origin, radius=d2)
+        circle_bvPipe_i = circles_bvPipe.addByCenterRadius(centerPoint=origin, radius=d_inner)
         #Extrude
-        pipe_SP_profile = sketch_SP.profiles.item(0)
-        ext_pipe_SP_input = new_comp.features.extrudeFeatures.createInput(profile=pipe_SP_profile, operation=adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-        ext_pipe_SP_input.setDistanceExtent(isSymmetric=False, distance=adsk.core.ValueInput.createByReal(30))                                                                           #Endret til 'False'
-        bodyBallValvePipe = new_comp.features.extrudeFeatures.add(ext_pipe_SP_input)
+        bvPipe_profile = sketch_bvPipe.profiles.item(0)
+        ext_bvPipe_input = ef.createInput(profile=bvPipe_profile, operation=adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
+        ext_bvPipe_input.setDistanceExtent(isSymmetric=False, distance=_VI(30))                                                                           #Endret til 'False'
+        bodyBallValvePipe = ef.add(ext_bvPipe_input)
         "Pipe box"
         #Construction Offset Plane
-        const_offsetPlane_input = new_comp.constructionPlanes.createInput()
-        const_offsetPlane_input.setByOffset(planarEntity=pipe_sp_profile, offset=adsk.core.ValueInput.createByReal(self.P/2+87))
-        const_offsetPlane = new_comp.constructionPlanes.add(const_offsetPlane_input)
-        #Center Point
-        center_sp = adsk.core.Point3D.create(0, 0, 0)
+        const_offsetPlane = self._offset_plane(new_comp, pipe_sp_profile, vi_ball, 'sp')
         #Sketch
-        sketch_SP = new_comp.sketches.add(const_offsetPlane)
-        circle_SP = sketch_SP.sketchCurves.sketchCircles
-        circle_SP_i = circle_SP.addByCenterRadius(centerPoint=center_sp, radius=self._d/2)
-        circle_SP_o = circle_SP.addByCenterRadius(centerPoint=center_sp, radius=self._d/2+6)
+        sketch_box = new_comp.sketches.add(const_offsetPlane)
+        circles_box = sketch_box.sketchCurves.sketchCircles
+        circle_box_i = circles_box.addByCenterRadius(centerPoint=origin, radius=d2)
+        circle_box_o = circles_box.addByCenterRadius(centerPoint=origin, radius=d2+6)
         #Extrude
-        pipe_SP_profile = sketch_SP.profiles.item(1)
-        ext_pipe_SP_input = new_comp.features.extrudeFeatures.createInput(profile=pipe_SP_profile, operation=adsk.fusion.FeatureOperations.JoinFeatureOperation)
-        ext_pipe_SP_input.setDistanceExtent(isSymmetric=True, distance=adsk.core.ValueInput.createByReal(7.5))                                                                           #Endret til 'False'
-        boxBallValvePipe = new_comp.features.extrudeFeatures.add(ext_pipe_SP_input)
-        
-        #Chamfer 
-
-        # Get the profiles defined by the circles.
-        # profile1 = sketch_SP.profiles.item(0)
-        # profile2 = sketch_SP.profiles.item(1)
-
-        # # Get the inner and outer profile
-        # areaPropertiesOfProfile1 = profile1.areaProperties()
-        # areaPropertiesOfProfile2 = profile2.areaProperties()
-        # areaOfProfile1 = areaPropertiesOfProfile1.area
-        # areaOfProfile2 = areaPropertiesOfProfile2.area
-
-        # outerProfile = profile1
-        # if areaOfProfile1 < areaOfProfile2:
-        #     outerProfile = profile2
-
-        ## Add the four edges into a collection
-        ##EdgeColl = adsk.core.ObjectCollection.create()
-        ##EdgeColl.add(profile1)
-        ##EdgeColl.add(sPt1)
-        ##EdgeColl.add(sPt2)
-        ##EdgeColl.add(sPt3)
-
-        # Get BrepEdge from inner loop on the end face of the extrusion
-        # extrudeEndFace = boxBallValvePipe.endFaces.item(0)
-        # brepLoops = extrudeEndFace.loops
-        # innerLoop = brepLoops.item(0)
-        # if innerLoop.isOuter:
-        #     innerLoop = brepLoops.item(1)
-        # brepEdges = innerLoop.edges
-        # brepEdge = brepEdges.item(0)
-
-        # Create the ChamferInput object.
-        # chamfers = new_comp.features.chamferFeatures
-        # chamferInput = chamfers.createInput2()
-        # offset = adsk.core.ValueInput.createByReal(3)
-        # chamferInput.chamferEdgeSets.addEqualDistanceChamferEdgeSet(brepEdge, offset, True)
-        
-        # Create the chamfer.
-        # chamfers.add(chamferInput)
-
-        "Lever"
-        #Construction Tangent Plane
-        # cons_tanPlane_input = new_comp.constructionPlanes.createInput()
-        # cons_tanPlane_input.setByTangent(boxBallValvePipe.sideFaces(0), angle=adsk.core.ValueInput.createByReal(0), planarEntity = pipe_sp_profile )  # evt "new_comp.xYConstructionPlane" istedenfor "planarEntity = pipe_sp_profile"
-        # cons_tanPlane_input = new_comp.constructionPlanes.add(cons_tanPlane_input)
-
-        #Constuction Plane through three points
-        # sketch_SP = new_comp.sketches.add(new_comp.yZConstructionPlane)
-        # sketchLines = sketch_SP.sketchCurves.sketchLines
-        # point1 = adsk.core.Point3D.create()
-       
+        box_profile = sketch_box.profiles.item(1)
+        ext_box_input = ef.createInput(profile=box_profile, operation=adsk.fusion.FeatureOperations.JoinFeatureOperation)
+        ext_box_input.setDistanceExtent(isSymmetric=True, distance=_VI(7.5))                                                                           #Endret til 'False'
+        boxBallValvePipe = ef.add(ext_box_input)
 
         "Ball"
         #Construction Offset Plane
-        const_offsetPlane_input = new_comp.constructionPlanes.createInput()
-        const_offsetPlane_input.setByOffset(planarEntity=pipe_sp_profile, offset=adsk.core.ValueInput.createByReal(self.P/2+87))
-        const_offsetPlane = new_comp.constructionPlanes.add(const_offsetPlane_input)
-        #Center Point
-        center_sp = adsk.core.Point3D.create(0, 0, 0)
+        const_offsetPlane = self._offset_plane(new_comp, pipe_sp_profile, vi_ball, 'sp')
         #Sketch
-        sketch_SP = new_comp.sketches.add(const_offsetPlane)
-        circle_SP = sketch_SP.sketchCurves.sketchCircles
-        circle_SP_Ball = circle_SP.addByCenterRadius(centerPoint=center_sp, radius=self._d/2-self._d/10)
-        line_halfCircle = sketch_SP.sketchCurves.sketchLines
-        line_halfCircle_ball = line_halfCircle.addByTwoPoints(adsk.core.Point3D.create(self._d/2-self._d/10, 0, 0), adsk.core.Point3D.create(-self._d/2+self._d/10, 0, 0))
+        sketch_ball = new_comp.sketches.add(const_offsetPlane)
+        circles_ball = sketch_ball.sketchCurves.sketchCircles
+        circle_ball = circles_ball.addByCenterRadius(centerPoint=origin, radius=d_inner)
+        lines_ball = sketch_ball.sketchCurves.sketchLines
+        line_halfCircle_ball = lines_ball.addByTwoPoints(_Point3D(d_inner, 0, 0), _Point3D(-d_inner, 0, 0))
         #Revolve
-        halfCircle_profile = sketch_SP.profiles.item(0)
-        revolve_ball = new_comp.features.revolveFeatures.createInput(profile=halfCircle_profile, axis=line_halfCircle_ball, operation=adsk.fusion.FeatureOperations.NewBodyFeatureOperation)        
-        revolve_ball.setAngleExtent(False, angle=adsk.core.ValueInput.createByString('360 deg')) 
-        bodyBallValveBall = new_comp.features.revolveFeatures.add(revolve_ball)
+        halfCircle_profile = sketch_ball.profiles.item(0)
+        revolve_ball = rf.createInput(profile=halfCircle_profile, axis=line_halfCircle_ball, operation=adsk.fusion.FeatureOperations.NewBodyFeatureOperation)        
+        revolve_ball.setAngleExtent(False, angle=VI_360)
+        bodyBallValveBall = rf.add(revolve_ball)
         #Sketch
-        sketch_SP = new_comp.sketches.add(const_offsetPlane)
-        circle_SP = sketch_SP.sketchCurves.sketchCircles
-        circle_cut_ball = circle_SP.addByCenterRadius(centerPoint=center_sp, radius=self._d/2-self._d/4)
+        sketch_ballCut = new_comp.sketches.add(const_offsetPlane)
+        circles_ballCut = sketch_ballCut.sketchCurves.sketchCircles
+        circle_cut_ball = circles_ballCut.addByCenterRadius(centerPoint=origin, radius=cut_r)
         #Extrude Cut
-        circleCut_profile = sketch_SP.profiles.item(0)
-        ext_cut_ball = new_comp.features.extrudeFeatures.createInput(profile=circleCut_profile, operation=adsk.fusion.FeatureOperations.CutFeatureOperation)
-        ext_cut_ball.setDistanceExtent(isSymmetric=True, distance=adsk.core.ValueInput.createByReal(self._d/2))
-        bodyBallValveBallHole = new_comp.features.extrudeFeatures.add(ext_cut_ball)
-        "Handle"
-        
-        
-        
+        circleCut_profile = sketch_ballCut.profiles.item(0)
+        ext_cut_ball = ef.createInput(profile=circleCut_profile, operation=adsk.fusion.FeatureOperations.CutFeatureOperation)
+        ext_cut_ball.setDistanceExtent(isSymmetric=True, distance=_VI(d2))
+        bodyBallValveBallHole = ef.add(ext_cut_ball)
 
         "Top spool piece"
         #Construction Offset Plane
-        const_offsetPlane_input = new_comp.constructionPlanes.createInput()
-        const_offsetPlane_input.setByOffset(planarEntity=pipe_sp_profile, offset=adsk.core.ValueInput.createByReal(self.P/2+102))
-        const_offsetPlane = new_comp.constructionPlanes.add(const_offsetPlane_input)
-        #Center Point
-        center_sp = adsk.core.Point3D.create(0, 0, 0)
-        #Sketch
-        sketch_SP = new_comp.sketches.add(const_offsetPlane)
-        circle_SP = sketch_SP.sketchCurves.sketchCircles
-        circle_SP_o = circle_SP.addByCenterRadius(centerPoint=center_sp, radius=self._d-self._d/10)
-        circle_SP_i = circle_SP.addByCenterRadius(centerPoint=center_sp, radius=self._d/2-self._d/10)
-        #Extrude
-        pipe_SP_profile = sketch_SP.profiles.item(0)
-        ext_pipe_SP_input = new_comp.features.extrudeFeatures.createInput(profile=pipe_SP_profile, operation=adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-        ext_pipe_SP_input.setDistanceExtent(isSymmetric=True, distance=adsk.core.ValueInput.createByReal(1))
-        bodyTwo = new_comp.features.extrudeFeatures.add(ext_pipe_SP_input)
-        #Sketch
-        parent_sketch = sketch_SP.sketchCurves.sketchCircles.addByCenterRadius(centerPoint=adsk.core.Point3D.create(0,self._d-5,0), radius=2)                  #item(2)
-        #Extrude Cut
-        spool_profile = sketch_SP.profiles.item(2)
-        ext_spool_hole = new_comp.features.extrudeFeatures.createInput(profile=spool_profile, operation=adsk.fusion.FeatureOperations.CutFeatureOperation)
-        ext_spool_hole.setDistanceExtent(isSymmetric=True, distance=adsk.core.ValueInput.createByReal(0.2*self._d))
-        circle_cut = new_comp.features.extrudeFeatures.add(ext_spool_hole)
-        #Circular Pattern
-        CircularPatterns = new_comp.features.circularPatternFeatures
-        inputEntitiesCollection = adsk.core.ObjectCollection.create()
-        inputEntitiesCollection.add(circle_cut)
-        inputAxis = const_axis_sp
-        CircularPatternInput = CircularPatterns.createInput(inputEntitiesCollection, inputAxis)
-        CircularPatternInput.quantity = adsk.core.ValueInput.createByReal(self.H)
-        CircularPatternInput.totalAngle = adsk.core.ValueInput.createByString('360 deg')
-        CircularPatternInput.isSymmetric = False
-        CircularPattern = CircularPatterns.add(CircularPatternInput)
+        const_offsetPlane = self._offset_plane(new_comp, pipe_sp_profile, _VI(P2+102), 'sp')
+        #Spool piece
+        self._build_spool(new_comp, const_offsetPlane, radius_outer=d_outer, radius_inner=d_inner,
+                          flange=VI_1, flange_symmetric=True,
+                          hole_center=hole_center_sp, hole_radius=2, hole_depth=vi_d_cut, hole_symmetric=True,
+                          axis=const_axis_sp, quantity=vi_H, center=origin)
 
         "Handle base"
         #Construction Plane at angle
-        const_plane_sp_input = new_comp.constructionPlanes.createInput()
-        const_plane_sp_input.setByAngle(linearEntity=new_comp.xConstructionAxis, angle=adsk.core.ValueInput.createByReal(self.theta+radians(90)), planarEntity=new_comp.xYConstructionPlane)   #self.theta+90
-        const_plane_sp = new_comp.constructionPlanes.add(const_plane_sp_input)
-        #Sketch circle extrude 1
-        sketch_sp = new_comp.sketches.add(const_plane_sp)
-        #center_sp = sketch_sp.modelToSketchSpace(center_global)
-        circles_sp = sketch_sp.sketchCurves.sketchCircles
-        center_box = adsk.core.Point3D.create(-1.218,108.25,-14)
-        circle_sp_o = circles_sp.addByCenterRadius(centerPoint=center_box, radius=2.5)
-        #Extrude
-        pipe_sp_profile = sketch_sp.profiles.item(0)  # get the pipe profile (profile between inner and outer circle)
-        ext_pipe_sp_input = new_comp.features.extrudeFeatures.createInput(profile=pipe_sp_profile, operation=adsk.fusion.FeatureOperations.JoinFeatureOperation)
-        ext_pipe_sp_input.setDistanceExtent(isSymmetric= True, distance=adsk.core.ValueInput.createByReal(2))
-        bodyOne = new_comp.features.extrudeFeatures.add(ext_pipe_sp_input)
-        #Sketch cicle extrude 2
-        sketch_sp = new_comp.sketches.add(const_plane_sp)
-        circles_sp = sketch_sp.sketchCurves.sketchCircles
-        center_box = adsk.core.Point3D.create(-1.218,108.25,-14)
-        circle_sp_o = circles_sp.addByCenterRadius(centerPoint=center_box, radius=1)
-        #Extrude
-        pipe_sp_profile = sketch_sp.profiles.item(0)  # get the pipe profile (profile between inner and outer circle)
-        ext_pipe_sp_input = new_comp.features.extrudeFeatures.createInput(profile=pipe_sp_profile, operation=adsk.fusion.FeatureOperations.JoinFeatureOperation)
-        ext_pipe_sp_input.setDistanceExtent(isSymmetric= True, distance=adsk.core.ValueInput.createByReal(3.5))
-        bodyOne = new_comp.features.extrudeFeatures.add(ext_pipe_sp_input)
+        const_plane_hb_input = new_comp.constructionPlanes.createInput()
+        const_plane_hb_input.setByAngle(linearEntity=new_comp.xConstructionAxis, angle=_VI(theta+HALF_PI), planarEntity=new_comp.xYConstructionPlane)   #theta+90
+        const_plane_hb = new_comp.constructionPlanes.add(const_plane_hb_input)
+        #Sketch both circles
+        sketch_hb = new_comp.sketches.add(const_plane_hb)
+        circles_hb = sketch_hb.sketchCurves.sketchCircles
+        center_box = _Point3D(-1.218,108.25,-14)
+        circle_hb_o = circles_hb.addByCenterRadius(centerPoint=center_box, radius=2.5)
+        circle_hb_i = circles_hb.addByCenterRadius(centerPoint=circle_hb_o.centerSketchPoint, radius=1)
+        #Profiles: the ring between the circles (item 0) and the inner disk (item 1)
+        hb_profiles = adsk.core.ObjectCollection.create()
+        for profile in sketch_hb.profiles:
+            hb_profiles.add(profile)
+        hb_inner_profile = sketch_hb.profiles.item(1)
+        #Extrude the full disk
+        ext_hb1_input = ef.createInput(profile=hb_profiles, operation=adsk.fusion.FeatureOperations.JoinFeatureOperation)
+        ext_hb1_input.setDistanceExtent(isSymmetric= True, distance=VI_2)
+        bodyHandleBase1 = ef.add(ext_hb1_input)
+        #Extrude the inner disk
+        ext_hb2_input = ef.createInput(profile=hb_inner_profile, operation=adsk.fusion.FeatureOperations.JoinFeatureOperation)
+        ext_hb2_input.setDistanceExtent(isSymmetric= True, distance=_VI(3.5))
+        bodyHandleBase2 = ef.add(ext_hb2_input)
 
         "Handle"
         #Sketch on zy-plane
-        sketch_SP = new_comp.sketches.add(new_comp.yZConstructionPlane)    #(z,y,x)
-        sketchLines = sketch_SP.sketchCurves.sketchLines
-        sketchArcs = sketch_SP.sketchCurves.sketchArcs
-
-        posArray = [0,1,2]
-        zArray = [-53.5,-50,-51.282,-46]
-        yArray = [-100,-90.35,-87.512,-73]
-
-        for i in posArray:
-            startPoint = adsk.core.Point3D.create(zArray[i],yArray[i],0)
-            endPoint = adsk.core.Point3D.create(zArray[i+1],yArray[i+1],0)
-            sketchLines.addByTwoPoints(startPoint,endPoint)
-
-        posArrayOffset = [0,1,2]
-        zArrayOff = [-46.7808,-52.137,-50.851,-54.264]
-        yArrayOff = [-72.806,-87.523,-90.37,-99.727]
-
-        for i in posArrayOffset:
-            startPoint = adsk.core.Point3D.create(zArrayOff[i],yArrayOff[i],0)
-            endPoint = adsk.core.Point3D.create(zArrayOff[i+1],yArrayOff[i+1],0)
-            sketchLines.addByTwoPoints(startPoint,endPoint)
+        sketch_handle = new_comp.sketches.add(new_comp.yZConstructionPlane)    #(z,y,x)
+        sketchLines = sketch_handle.sketchCurves.sketchLines
+        sketchArcs = sketch_handle.sketchCurves.sketchArcs
+
+        # Handle outline: two polylines of (z,y) points, closed by the two arcs below
+        handleOutline = (
+            ((-53.5,-100), (-50,-90.35), (-51.282,-87.512), (-46,-73)),
+            ((-46.7808,-72.806), (-52.137,-87.523), (-50.851,-90.37), (-54.264,-99.727)),
+        )
+        polylines = []
+        for side in handleOutline:
+            pts = [_Point3D(z,y,0) for z, y in side]
+            for startPoint, endPoint in zip(pts, pts[1:]):
+                sketchLines.addByTwoPoints(startPoint,endPoint)
+            polylines.append(pts)
+        pts = polylines[0]
         
-        arcStart = adsk.core.Point3D.create(-46,-73,0)
-        arcCenter = adsk.core.Point3D.create(-46.3904,-72.903,0)
-        sketchArcs.addByCenterStartSweep(arcCenter,arcStart,radians(180))
+        arcStart = pts[-1]              # (-46,-73)
+        arcCenter = _Point3D(-46.3904,-72.903,0)
+        sketchArcs.addByCenterStartSweep(arcCenter,arcStart,pi)
 
-        arcStart = adsk.core.Point3D.create(-53.5,-100,0)
-        arcCenter = adsk.core.Point3D.create(-53.882,-99.8635,0)
-        sketchArcs.addByCenterStartSweep(arcCenter,arcStart,radians(-180))
+        arcStart = pts[0]               # (-53.5,-100)
+        arcCenter = _Point3D(-53.882,-99.8635,0)
+        sketchArcs.addByCenterStartSweep(arcCenter,arcStart,-pi)
 
         #Extrude
-        pipe_sp_profile = sketch_sp.profiles.item(0)  
-        ext_pipe_sp_input = new_comp.features.extrudeFeatures.createInput(profile=pipe_sp_profile, operation=adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-        ext_pipe_sp_input.setDistanceExtent(isSymmetric= True, distance=adsk.core.ValueInput.createByReal(2))
-        Handle_ext = new_comp.features.extrudeFeatures.add(ext_pipe_sp_input)
+        handle_profile = hb_inner_profile
+        ext_handle_input = ef.createInput(profile=handle_profile, operation=adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
+        ext_handle_input.setDistanceExtent(isSymmetric= True, distance=VI_2)
+        Handle_ext = ef.add(ext_handle_input)
+
+        # Collapse this build into a single, named timeline group so it undoes as one step
+        if timeline and timeline.markerPosition > timeline_start:
+            timelineGroup = timeline.timelineGroups.add(timeline_start, timeline.markerPosition-1)
+            timelineGroup.name = new_comp.name
 
 
 